@@ -1,10 +1,13 @@
-from flask import Flask, request, jsonify, send_from_directory, Response
+import io
+import json
+import os
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from bedrock_core import send_message_to_bedrock, get_bedrock_client, stream_message_to_bedrock
 
 app = Flask(__name__, static_folder="web", static_url_path="")
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///chatanwar.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("CHATANWAR_DATABASE_URI", "sqlite:///chatanwar.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 db = SQLAlchemy(app)
 
@@ -15,6 +18,9 @@ class Chat(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     # New: favorite flag
     is_favorite = db.Column(db.Boolean, default=False, nullable=False)
+    # Set by /api/import so re-uploading the same chat (e.g. a retried
+    # localStorage sync) maps to the existing row instead of duplicating it
+    import_key = db.Column(db.String(100), unique=True)
 
 
 class Message(db.Model):
@@ -30,13 +36,15 @@ bedrock = None
 try:
     with app.app_context():
         db.create_all()
-        # Lightweight migration: add is_favorite to Chat if missing
+        # Lightweight migration: add is_favorite / import_key to Chat if missing
         try:
-            cols = db.session.execute(db.text("PRAGMA table_info(chat)"))
-            has_fav = any(row[1] == 'is_favorite' for row in cols)
-            if not has_fav:
+            cols = [row[1] for row in db.session.execute(db.text("PRAGMA table_info(chat)"))]
+            if 'is_favorite' not in cols:
                 db.session.execute(db.text("ALTER TABLE chat ADD COLUMN is_favorite BOOLEAN NOT NULL DEFAULT 0"))
-                db.session.commit()
+            if 'import_key' not in cols:
+                db.session.execute(db.text("ALTER TABLE chat ADD COLUMN import_key VARCHAR(100)"))
+                db.session.execute(db.text("CREATE UNIQUE INDEX IF NOT EXISTS ix_chat_import_key ON chat (import_key)"))
+            db.session.commit()
         except Exception:
             db.session.rollback()
     bedrock = get_bedrock_client()
@@ -191,6 +199,288 @@ def toggle_favorite(chat_id: int):
         return jsonify({"error": str(e)}), 500
 
 
+# Bulk export/import (NDJSON). Rows are fetched and inserted in batches, so
+# memory does not grow with the number of messages; import keeps one small
+# id-map entry per chat.
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+IMPORT_ROLES = ("user", "assistant")
+
+
+def _parse_created_at(value):
+    """Parse ISO strings (server export) or epoch millis (localStorage) to naive UTC.
+
+    Returns None when the value is missing; raises ValueError for anything else
+    that cannot be turned into a timestamp.
+    """
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value / 1000.0, tz=timezone.utc).replace(tzinfo=None)
+        if isinstance(value, str) and value:
+            if value.endswith(("Z", "z")):
+                value = value[:-1] + "+00:00"
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f"invalid createdAt: {value!r}")
+    raise ValueError(f"invalid createdAt: {value!r}")
+
+
+@app.get("/api/export")
+def export_history():
+    def generate():
+        # Rows are read in short keyset-paged queries that finish before each
+        # yield: an open SELECT would hold SQLite's shared lock (and block
+        # every writer) for as long as the client takes to download. Each page
+        # is a separate read, so both phases are bounded by the highest chat
+        # id seen up front to keep the file self-consistent (chat ids only
+        # grow; chats are never deleted).
+        max_chat_id = db.session.execute(db.select(db.func.max(Chat.id))).scalar() or 0
+        db.session.rollback()
+
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                db.select(Chat.id, Chat.title, Chat.created_at, Chat.is_favorite, Chat.import_key)
+                .where(Chat.id > last_id, Chat.id <= max_chat_id)
+                .order_by(Chat.id)
+                .limit(EXPORT_BATCH_SIZE)
+            ).all()
+            db.session.rollback()
+            if not rows:
+                break
+            lines = []
+            for c in rows:
+                item = {
+                    "type": "chat",
+                    "id": c.id,
+                    "title": c.title,
+                    "createdAt": c.created_at.isoformat() if c.created_at else None,
+                    "isFavorite": bool(c.is_favorite),
+                }
+                if c.import_key:
+                    item["importKey"] = c.import_key
+                lines.append(json.dumps(item) + "\n")
+            last_id = rows[-1].id
+            yield "".join(lines)
+
+        last_key = (0, 0)
+        while True:
+            rows = db.session.execute(
+                db.select(Message.id, Message.chat_id, Message.role, Message.content, Message.created_at)
+                .where(db.tuple_(Message.chat_id, Message.id) > last_key, Message.chat_id <= max_chat_id)
+                .order_by(Message.chat_id, Message.id)
+                .limit(EXPORT_BATCH_SIZE)
+            ).all()
+            db.session.rollback()
+            if not rows:
+                break
+            lines = []
+            for m in rows:
+                lines.append(json.dumps({
+                    "type": "message",
+                    "chatId": m.chat_id,
+                    "role": m.role,
+                    "content": m.content,
+                    "createdAt": m.created_at.isoformat() if m.created_at else None,
+                }) + "\n")
+            last_key = (rows[-1].chat_id, rows[-1].id)
+            yield "".join(lines)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=chatanwar-export.ndjson"},
+    )
+
+
+def _delete_imported_chats(chat_ids):
+    """Remove chats (and their messages) committed by a failed import."""
+    for i in range(0, len(chat_ids), 500):
+        chunk = chat_ids[i:i + 500]
+        db.session.execute(Message.__table__.delete().where(Message.chat_id.in_(chunk)))
+        db.session.execute(Chat.__table__.delete().where(Chat.id.in_(chunk)))
+    db.session.commit()
+
+
+@app.post("/api/import")
+def import_history():
+    """Import NDJSON produced by /api/export (or the localStorage sync).
+
+    A chat line must appear before any message that references it. Chat ids in
+    the upload are only used to link messages; new ids are assigned, and with
+    ?ids=1 the response includes them as "ids": {uploaded id: new id}.
+
+    Chats carrying an "importKey" that is already in the database (or earlier
+    in the same upload) are not imported again: they map to the existing chat
+    and their messages are skipped, so retried uploads do not create duplicates.
+
+    Messages without "createdAt" get the previous message's (or the chat's)
+    timestamp plus one microsecond so they keep their upload order.
+
+    Chats and messages are buffered and written every IMPORT_BATCH_SIZE lines:
+    one importKey lookup per batch, then executemany inserts for chats (ids come
+    back via RETURNING) and messages, then a commit, so other writers are not
+    locked out for the whole upload. If a line is rejected, the chats already
+    committed by this import are deleted again; if the process dies mid-import,
+    the batches committed so far remain.
+    """
+    want_ids = request.args.get("ids") in ("1", "true", "True")
+    # Per uploaded chat: {"row": insert values, "id": db id once flushed,
+    # "skipped": importKey already present, "last_ts": for timestamp fill-in}
+    id_map = {}
+    seen_keys = {}
+    created_ids = []
+    pending_chats = []
+    batch = []
+    pending = 0
+    counts = {"chats": 0, "skippedChats": 0, "messages": 0}
+    line_no = 0
+
+    def commit_batch():
+        if pending_chats:
+            keys = [c["row"]["import_key"] for c in pending_chats if c["row"]["import_key"]]
+            existing = {}
+            for i in range(0, len(keys), 500):
+                existing.update(db.session.execute(
+                    db.select(Chat.import_key, Chat.id).where(Chat.import_key.in_(keys[i:i + 500]))
+                ).all())
+            new_chats = []
+            for c in pending_chats:
+                if c["row"]["import_key"] in existing:
+                    c["id"] = existing[c["row"]["import_key"]]
+                    c["skipped"] = True
+                    counts["skippedChats"] += 1
+                else:
+                    new_chats.append(c)
+            if new_chats:
+                rows = [c["row"] for c in new_chats]
+                if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+                    ids = db.session.execute(
+                        Chat.__table__.insert().returning(Chat.id, sort_by_parameter_order=True), rows
+                    ).scalars().all()
+                else:
+                    # SQLite < 3.35 has no RETURNING; fall back to one row at a time
+                    ids = [db.session.execute(Chat.__table__.insert().values(**row)).inserted_primary_key[0]
+                           for row in rows]
+                for c, chat_id in zip(new_chats, ids):
+                    c["id"] = chat_id
+                    created_ids.append(chat_id)
+                counts["chats"] += len(new_chats)
+            for c in pending_chats:
+                del c["row"]  # only id/skipped/last_ts are needed from here on
+            pending_chats.clear()
+        rows = [dict(m, chat_id=chat["id"]) for chat, m in batch if not chat["skipped"]]
+        if rows:
+            db.session.execute(Message.__table__.insert(), rows)
+            counts["messages"] += len(rows)
+        batch.clear()
+        db.session.commit()
+
+    stream = request.stream
+    if isinstance(stream, io.RawIOBase):
+        # Raw streams read lines a byte at a time; buffer them
+        stream = io.BufferedReader(stream, 64 * 1024)
+
+    try:
+        for raw in stream:
+            line_no += 1
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                item = json.loads(raw)
+            except ValueError as e:
+                raise ValueError(f"invalid JSON: {e}")
+            if not isinstance(item, dict):
+                raise ValueError("expected a JSON object")
+
+            kind = item.get("type")
+            if kind == "chat":
+                source_id = str(item.get("id"))
+                created_at = _parse_created_at(item.get("createdAt")) or datetime.utcnow()
+                title = item.get("title")
+                if title is not None and not isinstance(title, str):
+                    raise ValueError("'title' must be a string")
+                is_favorite = item.get("isFavorite", False)
+                if not isinstance(is_favorite, bool):
+                    raise ValueError("'isFavorite' must be true or false")
+                import_key = item.get("importKey")
+                if import_key is not None and (not isinstance(import_key, str) or not 0 < len(import_key) <= 100):
+                    raise ValueError("'importKey' must be a string of 1-100 characters")
+                if import_key in seen_keys:
+                    # Repeated within this upload: link to the first, drop its messages
+                    first = seen_keys[import_key]
+                    id_map[source_id] = {"alias": first, "skipped": True}
+                    counts["skippedChats"] += 1
+                    continue
+                chat = {
+                    "row": {
+                        "title": (title or "New chat")[:200],
+                        "created_at": created_at,
+                        "is_favorite": is_favorite,
+                        "import_key": import_key,
+                    },
+                    "id": None,
+                    "skipped": False,
+                    "last_ts": created_at,
+                }
+                if import_key:
+                    seen_keys[import_key] = chat
+                id_map[source_id] = chat
+                pending_chats.append(chat)
+            elif kind == "message":
+                chat = id_map.get(str(item.get("chatId")))
+                if chat is None:
+                    raise ValueError("message references unknown chat")
+                role = item.get("role")
+                content = item.get("content")
+                if role not in IMPORT_ROLES:
+                    raise ValueError(f"'role' must be one of {', '.join(IMPORT_ROLES)}")
+                if not isinstance(content, str):
+                    raise ValueError("message needs a string 'content'")
+                created_at = _parse_created_at(item.get("createdAt"))
+                if "alias" in chat:
+                    continue
+                if created_at is None:
+                    try:
+                        created_at = chat["last_ts"] + timedelta(microseconds=1)
+                    except OverflowError:
+                        raise ValueError("createdAt out of range (previous timestamp is the maximum)")
+                chat["last_ts"] = created_at
+                batch.append((chat, {"role": role, "content": content, "created_at": created_at}))
+            else:
+                raise ValueError(f"unknown type: {kind!r}")
+
+            pending += 1
+            if pending >= IMPORT_BATCH_SIZE:
+                commit_batch()
+                pending = 0
+        commit_batch()
+    except Exception as e:
+        db.session.rollback()
+        try:
+            _delete_imported_chats(created_ids)
+        except Exception:
+            db.session.rollback()
+            app.logger.error(f"Failed to clean up partial import: {created_ids}")
+        if isinstance(e, ValueError):
+            return jsonify({"error": f"line {line_no}: {e}"}), 400
+        return jsonify({"error": str(e)}), 500
+
+    result = dict(counts)
+    if want_ids:
+        result["ids"] = {
+            source_id: (chat["alias"] if "alias" in chat else chat)["id"]
+            for source_id, chat in id_map.items()
+        }
+    return jsonify(result)
+
+
 if __name__ == "__main__":
     # Run development server
     app.run(host="0.0.0.0", port=5000, debug=True)
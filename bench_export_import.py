@@ -0,0 +1,88 @@
+"""
+Throughput benchmark for the NDJSON bulk endpoints (/api/import, /api/export).
+
+Generates an NDJSON file with N messages (default 1,000,000) spread across
+chats, imports it into a throwaway SQLite database, then streams it back out.
+Reports rows/sec and peak RSS so memory growth is easy to spot.
+
+Usage:
+    python bench_export_import.py [messages] [messages_per_chat]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from werkzeug.test import create_environ, run_wsgi_app
+
+
+def peak_rss() -> str:
+    try:
+        import resource  # not available on Windows
+    except ImportError:
+        return "n/a"
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return f"{mb:.1f} MiB"
+
+
+def write_ndjson(path: str, total: int, per_chat: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        chat_id = 0
+        for i in range(total):
+            if i % per_chat == 0:
+                chat_id += 1
+                f.write(json.dumps({"type": "chat", "id": chat_id, "title": f"Chat {chat_id}"}) + "\n")
+            role = "user" if i % 2 == 0 else "assistant"
+            f.write(json.dumps({"type": "message", "chatId": chat_id, "role": role, "content": f"Message {i} " + "lorem ipsum " * 8}) + "\n")
+
+
+def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    per_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CHATANWAR_DATABASE_URI"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+        from app import app
+
+        src = os.path.join(tmp, "input.ndjson")
+
+        t0 = time.perf_counter()
+        write_ndjson(src, total, per_chat)
+        size_mb = os.path.getsize(src) / (1024 * 1024)
+        print(f"Generated {total:,} messages ({size_mb:.1f} MiB) in {time.perf_counter() - t0:.1f}s")
+        print(f"Peak RSS after generate: {peak_rss()}")
+
+        # Feed the file as wsgi.input directly; the test client would copy the
+        # whole body into memory first and skew the RSS numbers.
+        t0 = time.perf_counter()
+        with open(src, "rb") as f:
+            environ = create_environ("/api/import", method="POST", content_type="application/x-ndjson")
+            environ["wsgi.input"] = f
+            environ["CONTENT_LENGTH"] = str(os.path.getsize(src))
+            app_iter, status, _ = run_wsgi_app(app, environ, buffered=True)
+            body = b"".join(app_iter)
+        elapsed = time.perf_counter() - t0
+        if not status.startswith("200"):
+            print(f"Import failed: {status} {body[:500].decode()}")
+            sys.exit(1)
+        imported = json.loads(body)["messages"]
+        print(f"Import: {imported:,} messages in {elapsed:.1f}s ({imported / elapsed:,.0f} msg/s)")
+        print(f"Peak RSS after import: {peak_rss()}")
+
+        t0 = time.perf_counter()
+        res = app.test_client().get("/api/export", buffered=False)
+        lines = 0
+        for chunk in res.response:
+            lines += chunk.count("\n") if isinstance(chunk, str) else chunk.count(b"\n")
+        res.close()
+        elapsed = time.perf_counter() - t0
+        print(f"Export: {lines:,} lines in {elapsed:.1f}s ({lines / elapsed:,.0f} lines/s)")
+        print(f"Peak RSS after export: {peak_rss()}")
+
+
+if __name__ == "__main__":
+    main()
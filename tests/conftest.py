@@ -0,0 +1,24 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def db_path(tmp_path_factory):
+    """Point the app at a throwaway SQLite file before it is imported."""
+    path = tmp_path_factory.mktemp("chatanwar") / "test.db"
+    os.environ["CHATANWAR_DATABASE_URI"] = "sqlite:///" + str(path)
+    yield str(path)
+    os.environ.pop("CHATANWAR_DATABASE_URI", None)
+
+
+@pytest.fixture(scope="session")
+def app_module(db_path):
+    module = importlib.import_module("app")
+    yield module
+    with module.app.app_context():
+        module.db.engine.dispose()
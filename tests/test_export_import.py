@@ -0,0 +1,272 @@
+import json
+import sqlite3
+
+import pytest
+
+
+def ndjson(*items):
+    return "".join(json.dumps(item) + "\n" for item in items)
+
+
+def post_import(client, body, query=""):
+    return client.post("/api/import" + query, data=body, content_type="application/x-ndjson")
+
+
+def export_lines(client):
+    res = client.get("/api/export")
+    assert res.status_code == 200
+    return [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+
+
+@pytest.fixture
+def wipe(app_module):
+    def wipe():
+        with app_module.app.app_context():
+            app_module.db.session.execute(app_module.Message.__table__.delete())
+            app_module.db.session.execute(app_module.Chat.__table__.delete())
+            app_module.db.session.commit()
+    return wipe
+
+
+@pytest.fixture
+def counts(app_module):
+    def counts():
+        with app_module.app.app_context():
+            session = app_module.db.session
+            return session.query(app_module.Chat).count(), session.query(app_module.Message).count()
+    return counts
+
+
+@pytest.fixture
+def client(app_module, wipe):
+    wipe()
+    return app_module.app.test_client()
+
+
+def test_round_trip(client, wipe):
+    body = ndjson(
+        {"type": "chat", "id": "c_1", "title": "First", "createdAt": 1700000000000, "isFavorite": True},
+        {"type": "message", "chatId": "c_1", "role": "user", "content": "hi"},
+        {"type": "message", "chatId": "c_1", "role": "assistant", "content": "line\nbreak"},
+        {"type": "chat", "id": "c_2", "title": "Second"},
+        {"type": "message", "chatId": "c_2", "role": "user", "content": "yo"},
+    )
+    res = post_import(client, body)
+    assert res.status_code == 200
+    assert res.json == {"chats": 2, "skippedChats": 0, "messages": 3}
+
+    first = export_lines(client)
+    assert [line["type"] for line in first] == ["chat", "chat", "message", "message", "message"]
+
+    wipe()
+    res = post_import(client, "".join(json.dumps(line) + "\n" for line in first))
+    assert res.status_code == 200
+    assert res.json["messages"] == 3
+
+    def strip_ids(lines):
+        return [{k: v for k, v in line.items() if k not in ("id", "chatId")} for line in lines]
+
+    assert strip_ids(export_lines(client)) == strip_ids(first)
+
+
+def test_ids_only_when_requested(client):
+    body = ndjson({"type": "chat", "id": "c_1", "title": "t"})
+    assert "ids" not in post_import(client, body).json
+    res = post_import(client, body, "?ids=1")
+    assert set(res.json["ids"]) == {"c_1"}
+
+
+def test_message_before_chat_is_rejected(client, counts):
+    res = post_import(client, ndjson({"type": "message", "chatId": "x", "role": "user", "content": "a"}))
+    assert res.status_code == 400
+    assert res.json["error"].startswith("line 1:")
+    assert counts() == (0, 0)
+
+
+def test_bad_json_reports_line(client, counts):
+    body = ndjson({"type": "chat", "id": 1, "title": "t"}) + "\nnot json\n"
+    res = post_import(client, body)
+    assert res.status_code == 400
+    assert res.json["error"].startswith("line 3: invalid JSON")
+    assert counts() == (0, 0)
+
+
+def test_failure_after_committed_batches_leaves_no_rows(client, counts, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "IMPORT_BATCH_SIZE", 2)
+    body = ndjson(
+        {"type": "chat", "id": 1, "title": "a"},
+        {"type": "message", "chatId": 1, "role": "user", "content": "1"},
+        {"type": "message", "chatId": 1, "role": "assistant", "content": "2"},
+        {"type": "chat", "id": 2, "title": "b"},
+        {"type": "message", "chatId": 2, "role": "user", "content": "3"},
+        {"type": "message", "chatId": 99, "role": "user", "content": "4"},
+    )
+    res = post_import(client, body)
+    assert res.status_code == 400
+    assert res.json["error"].startswith("line 6:")
+    assert counts() == (0, 0)
+
+
+@pytest.mark.parametrize("role", ["wizard", "system", "", None])
+def test_unknown_role_is_rejected(client, role):
+    body = ndjson(
+        {"type": "chat", "id": 1, "title": "t"},
+        {"type": "message", "chatId": 1, "role": role, "content": "a"},
+    )
+    res = post_import(client, body)
+    assert res.status_code == 400
+    assert res.json["error"].startswith("line 2:")
+
+
+@pytest.mark.parametrize("value", [1e20, {"a": 1}, [1], True, "yesterday", float("nan")])
+def test_bad_created_at_is_rejected(client, value):
+    body = json.dumps({"type": "chat", "id": 1, "title": "t"}) + "\n" + json.dumps(
+        {"type": "message", "chatId": 1, "role": "user", "content": "a", "createdAt": value}
+    ) + "\n"
+    res = post_import(client, body)
+    assert res.status_code == 400
+    assert res.json["error"].startswith("line 2: invalid createdAt")
+
+
+def test_aware_timestamps_are_stored_as_utc(client):
+    body = ndjson(
+        {"type": "chat", "id": 1, "title": "t", "createdAt": "2024-01-01T12:00:00Z"},
+        {"type": "message", "chatId": 1, "role": "user", "content": "a", "createdAt": "2024-01-01T17:00:00+05:00"},
+    )
+    assert post_import(client, body).status_code == 200
+    chat, message = export_lines(client)
+    assert chat["createdAt"] == "2024-01-01T12:00:00"
+    assert message["createdAt"] == "2024-01-01T12:00:00"
+
+
+def test_missing_created_at_keeps_upload_order(client):
+    body = ndjson(
+        {"type": "chat", "id": 1, "title": "t", "createdAt": "2024-01-01T00:00:00"},
+        {"type": "message", "chatId": 1, "role": "user", "content": "hi"},
+        {"type": "message", "chatId": 1, "role": "assistant", "content": "yo", "createdAt": "2024-01-01T00:00:05"},
+        {"type": "message", "chatId": 1, "role": "user", "content": "again"},
+    )
+    res = post_import(client, body, "?ids=1")
+    chat_id = res.json["ids"]["1"]
+    rows = client.get(f"/api/chats/{chat_id}/messages").json
+    assert [m["content"] for m in rows] == ["hi", "yo", "again"]
+    assert rows[0]["createdAt"] == "2024-01-01T00:00:00.000001"
+    assert rows[2]["createdAt"] == "2024-01-01T00:00:05.000001"
+
+
+def test_import_key_makes_retries_idempotent(client, counts):
+    body = ndjson(
+        {"type": "chat", "id": "c_1", "importKey": "dev:c_1", "title": "t"},
+        {"type": "message", "chatId": "c_1", "role": "user", "content": "a"},
+    )
+    first = post_import(client, body, "?ids=1").json
+    second = post_import(client, body, "?ids=1").json
+    assert second["ids"] == first["ids"]
+    assert (second["chats"], second["skippedChats"], second["messages"]) == (0, 1, 0)
+    assert counts() == (1, 1)
+
+
+def test_export_ignores_chats_created_mid_export(client, db_path):
+    post_import(client, ndjson(
+        {"type": "chat", "id": 1, "title": "existing"},
+        {"type": "message", "chatId": 1, "role": "user", "content": "a"},
+    ))
+    res = client.get("/api/export", buffered=False)
+    chunks = iter(res.response)
+    out = [next(chunks)]
+
+    # Another writer adds a chat and message after the chat rows were read
+    conn = sqlite3.connect(db_path, timeout=5)
+    with conn:
+        cur = conn.execute("INSERT INTO chat (title, is_favorite) VALUES ('late', 0)")
+        conn.execute(
+            "INSERT INTO message (chat_id, role, content) VALUES (?, 'user', 'late')",
+            (cur.lastrowid,),
+        )
+    conn.close()
+
+    out.extend(chunks)
+    res.close()
+    body = b"".join(c if isinstance(c, bytes) else c.encode() for c in out)
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert [line.get("content") for line in lines if line["type"] == "message"] == ["a"]
+    assert post_import(client, body).status_code == 200
+
+
+def test_export_does_not_block_writers_during_message_phase(client, app_module, db_path, monkeypatch):
+    monkeypatch.setattr(app_module, "EXPORT_BATCH_SIZE", 2)
+    post_import(client, ndjson(
+        {"type": "chat", "id": 1, "title": "existing"},
+        *({"type": "message", "chatId": 1, "role": "user", "content": str(i)} for i in range(6)),
+    ))
+    res = client.get("/api/export", buffered=False)
+    chunks = iter(res.response)
+    out = [next(chunks), next(chunks)]  # chat page, first message page
+    assert b'"type": "message"' in out[-1]
+
+    conn = sqlite3.connect(db_path, timeout=1)
+    with conn:
+        cur = conn.execute("INSERT INTO chat (title, is_favorite) VALUES ('late', 0)")
+        conn.execute(
+            "INSERT INTO message (chat_id, role, content) VALUES (?, 'user', 'late')",
+            (cur.lastrowid,),
+        )
+    conn.close()
+
+    out.extend(chunks)
+    res.close()
+    body = b"".join(out)
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert [line["content"] for line in lines if line["type"] == "message"] == [str(i) for i in range(6)]
+    assert post_import(client, body).status_code == 200
+
+
+def test_many_small_chats_keep_their_messages(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "IMPORT_BATCH_SIZE", 7)
+    items = []
+    for i in range(20):
+        items.append({"type": "chat", "id": f"c_{i}", "importKey": f"dev:c_{i}", "title": f"chat {i}"})
+        items.append({"type": "message", "chatId": f"c_{i}", "role": "user", "content": f"msg {i}"})
+    res = post_import(client, ndjson(*items), "?ids=1")
+    assert res.json["chats"] == 20
+    for i in range(20):
+        chat_id = res.json["ids"][f"c_{i}"]
+        assert [m["content"] for m in client.get(f"/api/chats/{chat_id}/messages").json] == [f"msg {i}"]
+
+
+def test_repeated_import_key_in_one_upload(client, counts):
+    body = ndjson(
+        {"type": "chat", "id": "a", "importKey": "k", "title": "t"},
+        {"type": "message", "chatId": "a", "role": "user", "content": "1"},
+        {"type": "chat", "id": "b", "importKey": "k", "title": "t"},
+        {"type": "message", "chatId": "b", "role": "user", "content": "2"},
+    )
+    res = post_import(client, body, "?ids=1")
+    assert res.status_code == 200
+    assert res.json["ids"]["a"] == res.json["ids"]["b"]
+    assert (res.json["chats"], res.json["skippedChats"], res.json["messages"]) == (1, 1, 1)
+    assert counts() == (1, 1)
+
+
+@pytest.mark.parametrize("field, value", [
+    ("isFavorite", "false"),
+    ("isFavorite", 1),
+    ("title", {"a": 1}),
+    ("title", 5),
+])
+def test_bad_chat_fields_are_rejected(client, counts, field, value):
+    res = post_import(client, ndjson({"type": "chat", "id": 1, "title": "t", field: value}))
+    assert res.status_code == 400
+    assert res.json["error"].startswith(f"line 1: '{field}'")
+    assert counts() == (0, 0)
+
+
+def test_filled_in_timestamp_overflow_is_rejected(client, counts):
+    body = ndjson(
+        {"type": "chat", "id": 1, "title": "t", "createdAt": "9999-12-31T23:59:59.999999"},
+        {"type": "message", "chatId": 1, "role": "user", "content": "a"},
+    )
+    res = post_import(client, body)
+    assert res.status_code == 400
+    assert res.json["error"].startswith("line 2: createdAt out of range")
+    assert counts() == (0, 0)
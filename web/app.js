@@ -384,6 +384,70 @@ async function createChat(title) {
   return id;
 }
 
+// Push local-only chats (ids starting with 'c_') to the server via the NDJSON
+// import endpoint, then re-key them under the ids the server assigned.
+// Each chat carries an importKey (per-browser id + local id) so the server
+// maps a retried upload to the chat it already created instead of duplicating it.
+let syncInFlight = null;
+
+function getSyncDeviceId() {
+  let deviceId = localStorage.getItem('syncDeviceId');
+  if (!deviceId) {
+    deviceId = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+    localStorage.setItem('syncDeviceId', deviceId);
+  }
+  return deviceId;
+}
+
+async function pushLocalChats() {
+  const localIds = Object.keys(chats).filter(id => String(id).startsWith('c_'));
+  if (localIds.length === 0) return;
+  const deviceId = getSyncDeviceId();
+  const lines = [];
+  const sentCounts = {};
+  for (const id of localIds) {
+    const chat = chats[id];
+    sentCounts[id] = (chat.messages || []).length;
+    lines.push(JSON.stringify({ type: 'chat', id, importKey: `${deviceId}:${id}`, title: chat.title, createdAt: chat.createdAt, isFavorite: !!chat.isFavorite || favorites.includes(id) }));
+    for (const m of (chat.messages || [])) {
+      if (m.role !== 'user' && m.role !== 'assistant') continue;
+      lines.push(JSON.stringify({ type: 'message', chatId: id, role: m.role, content: m.content }));
+    }
+  }
+  const res = await fetch('/api/import?ids=1', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/x-ndjson' },
+    body: lines.join('\n') + '\n',
+  });
+  if (!res.ok) return;
+  const data = await res.json();
+  for (const [oldId, newId] of Object.entries(data.ids || {})) {
+    // Messages added while the upload was in flight never reached the server;
+    // keep such chats local rather than re-keying them with a stale copy
+    if (!chats[oldId] || (chats[oldId].messages || []).length !== sentCounts[oldId]) continue;
+    const id = String(newId);
+    const wasFav = favorites.includes(oldId);
+    chats[id] = { ...chats[oldId], id, isFavorite: !!chats[oldId].isFavorite || wasFav };
+    delete chats[oldId];
+    if (wasFav) favorites = favorites.filter(f => f !== oldId);
+    if (currentChatId === oldId) {
+      currentChatId = id;
+      try { history.replaceState(null, '', `#chat=${encodeURIComponent(id)}`); } catch {}
+    }
+  }
+  saveState();
+  renderChatList();
+}
+
+function syncLocalChatsToServer() {
+  // One sync at a time per tab, and across tabs where Web Locks are available
+  if (syncInFlight) return syncInFlight;
+  const run = () => pushLocalChats().catch(() => {});
+  syncInFlight = (navigator.locks ? navigator.locks.request('chatanwar-sync', run) : run())
+    .finally(() => { syncInFlight = null; });
+  return syncInFlight;
+}
+
 function updateCurrentChatTitleFrom(text) {
   const title = text.trim().slice(0, 40) || 'New chat';
   if (currentChatId && chats[currentChatId]) {
@@ -454,6 +518,8 @@ formEl.addEventListener('submit', async (e) => {
   e.preventDefault();
   const text = inputEl.value.trim();
   if (!text) return;
+  // Don't grow a c_* chat while it is being uploaded
+  if (syncInFlight) await syncInFlight;
 
   // Optimistic render
   appendMessage('user', text);
@@ -821,6 +887,7 @@ document.addEventListener('DOMContentLoaded', () => {
         });
         saveState();
         renderChatList();
+        await syncLocalChatsToServer();
       }
     } catch {}
   })();